@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import sqlite3
-from dataclasses import dataclass
 from datetime import datetime, date, timedelta
 from zoneinfo import ZoneInfo
 import math
@@ -18,188 +18,286 @@ st.set_page_config(page_title=APP_TITLE, page_icon="🏋️", layout="centered")
 # -----------------------------
 # Database
 # -----------------------------
+@st.cache_resource
 def db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    # one process-wide connection; sqlite3.connect is file-backed and
+    # re-opening per query dominates latency for a workload this small.
+    # Bind sites pass pre-formatted ISO strings; the adapter is a cheap
+    # safety net so a stray date bind stays consistent with the TEXT
+    # column (the implicit default converter is deprecated anyway)
+    sqlite3.register_adapter(date, date.isoformat)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
     conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    init_db(conn)
     return conn
 
-def init_db():
-    conn = db()
-    conn.execute("""
+def bump_db_version():
+    # invalidates the read_checkins cache on the next rerun
+    st.session_state["db_version"] = st.session_state.get("db_version", 0) + 1
+
+def init_db(conn):
+    # whole schema in one script + one transaction (single parse round-trip
+    # and fsync); runs once per process since the connection is cached
+    conn.executescript("""
+        BEGIN;
         CREATE TABLE IF NOT EXISTS checkins (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             day TEXT NOT NULL UNIQUE,
             created_at TEXT NOT NULL,
-            intensity TEXT NOT NULL,
+            intensity INTEGER NOT NULL,
             minutes INTEGER NOT NULL,
             notes TEXT
         );
-    """)
-    conn.execute("""
         CREATE TABLE IF NOT EXISTS meta (
             k TEXT PRIMARY KEY,
             v TEXT NOT NULL
         );
+        -- the UNIQUE constraint already implies an index, but keep it
+        -- explicit: all range filters below lean on ordered day lookups
+        CREATE INDEX IF NOT EXISTS ix_checkins_day ON checkins(day);
+        COMMIT;
+    """)
+    _migrate_intensity_codes(conn)
+
+def _migrate_intensity_codes(conn):
+    # legacy databases stored intensity as a TEXT label; TEXT affinity
+    # would coerce codes back to strings, so rebuild the table once
+    cols = conn.execute("PRAGMA table_info(checkins)").fetchall()
+    if not any(c[1] == "intensity" and c[2].upper() == "TEXT" for c in cols):
+        return
+    conn.executescript("""
+        BEGIN;
+        ALTER TABLE checkins RENAME TO checkins_legacy;
+        CREATE TABLE checkins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            day TEXT NOT NULL UNIQUE,
+            created_at TEXT NOT NULL,
+            intensity INTEGER NOT NULL,
+            minutes INTEGER NOT NULL,
+            notes TEXT
+        );
+        INSERT INTO checkins (id, day, created_at, intensity, minutes, notes)
+            SELECT id, day, created_at, CASE intensity
+                WHEN 'Minimum (showed up)' THEN 0
+                WHEN 'Standard' THEN 1
+                WHEN 'Hard' THEN 2
+                WHEN 'Recovery / Mobility' THEN 3
+                ELSE CAST(intensity AS INTEGER) END,
+                minutes, notes
+            FROM checkins_legacy;
+        DROP TABLE checkins_legacy;
+        CREATE INDEX IF NOT EXISTS ix_checkins_day ON checkins(day);
+        COMMIT;
     """)
-    conn.commit()
-    conn.close()
 
 def meta_get(key: str, default: str) -> str:
-    conn = db()
-    cur = conn.execute("SELECT v FROM meta WHERE k = ?", (key,))
+    cur = db().execute("SELECT v FROM meta WHERE k = ?", (key,))
     row = cur.fetchone()
-    conn.close()
     return row[0] if row else default
 
 def meta_set(key: str, value: str):
-    conn = db()
-    conn.execute(
+    db().execute(
         "INSERT INTO meta (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
         (key, value),
     )
-    conn.commit()
-    conn.close()
 
-def read_checkins() -> pd.DataFrame:
-    conn = db()
-    df = pd.read_sql_query("SELECT day, created_at, intensity, minutes, notes FROM checkins ORDER BY day ASC", conn)
-    conn.close()
-    if df.empty:
-        return df
-    df["day"] = pd.to_datetime(df["day"]).dt.date
-    df["created_at"] = pd.to_datetime(df["created_at"])
+@st.cache_data(ttl=60)
+def read_checkins(version: int) -> pd.DataFrame:
+    # `version` is st.session_state["db_version"]; writers bump it so the
+    # cached frame is only re-read after a mutation (or the ttl lapses)
+    df = pd.read_sql_query("SELECT day, created_at, intensity, minutes, notes FROM checkins ORDER BY day ASC", db())
+    days = np.array([], dtype="datetime64[D]")
+    if not df.empty:
+        # keep days as datetime64 (not boxed date objects) so downstream
+        # comparisons and diffs stay in NumPy int64 space
+        days = pd.to_datetime(df["day"], format="%Y-%m-%d").to_numpy().astype("datetime64[D]")
+        df["day"] = days
+        df["created_at"] = pd.to_datetime(df["created_at"])
+    # membership set built once per cached frame, reused across reruns
+    # (datetime64[D].tolist() yields date objects, matching `today` checks)
+    df.attrs["days_set"] = frozenset(days.tolist())
     return df
 
-def has_checkin(day: date) -> bool:
-    conn = db()
-    cur = conn.execute("SELECT 1 FROM checkins WHERE day = ? LIMIT 1", (day.isoformat(),))
-    row = cur.fetchone()
-    conn.close()
-    return row is not None
+def count_checkins(start: date, end: date = None) -> int:
+    # ISO-8601 strings sort lexicographically, so the comparison stays on
+    # the indexed column (no expression wrapping the column)
+    if end is None:
+        cur = db().execute("SELECT COUNT(*) FROM checkins WHERE day >= ?", (start.isoformat(),))
+    else:
+        cur = db().execute(
+            "SELECT COUNT(*) FROM checkins WHERE day >= ? AND day <= ?",
+            (start.isoformat(), end.isoformat()),
+        )
+    return int(cur.fetchone()[0])
+
+@st.cache_data(ttl=60)
+def read_recent_checkins(version: int, limit: int = 365) -> pd.DataFrame:
+    # newest-first straight off the day index (no pandas sort), bounded —
+    # st.dataframe only renders a viewport, so unbounded history is waste
+    return pd.read_sql_query(
+        "SELECT day, created_at, intensity, minutes, notes FROM checkins ORDER BY day DESC LIMIT ?",
+        db(), params=(limit,),
+    )
 
-def add_checkin(day: date, intensity: str, minutes: int, notes: str):
+def add_checkin(day: date, intensity: int, minutes: int, notes: str) -> bool:
+    # single UPSERT: a duplicate day is a no-op, so no pre-check SELECT is
+    # needed; the explicit transaction makes row + xp updates one fsync
     conn = db()
-    conn.execute(
-        "INSERT INTO checkins (day, created_at, intensity, minutes, notes) VALUES (?, ?, ?, ?, ?)",
-        (day.isoformat(), datetime.now(TZ).isoformat(), intensity, minutes, notes.strip() if notes else None),
-    )
-    conn.commit()
-    conn.close()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cur = conn.execute(
+            "INSERT INTO checkins (day, created_at, intensity, minutes, notes) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(day) DO NOTHING RETURNING id",
+            (day.isoformat(), datetime.now(TZ).isoformat(), intensity, minutes, notes.strip() if notes else None),
+        )
+        inserted = cur.fetchone() is not None
+        if inserted:
+            bump_xp_base(checkin_xp(intensity, minutes))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    if inserted:
+        bump_db_version()
+    return inserted
 
 def delete_checkin(day: date):
     conn = db()
-    conn.execute("DELETE FROM checkins WHERE day = ?", (day.isoformat(),))
-    conn.commit()
-    conn.close()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT intensity, minutes FROM checkins WHERE day = ?", (day.isoformat(),)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM checkins WHERE day = ?", (day.isoformat(),))
+            bump_xp_base(-checkin_xp(row[0], int(row[1])))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    if row is not None:
+        bump_db_version()
+
+def bump_xp_base(delta: int):
+    db().execute(
+        "INSERT INTO meta (k, v) VALUES ('xp_base', ?) "
+        "ON CONFLICT(k) DO UPDATE SET v = CAST(v AS INT) + CAST(excluded.v AS INT)",
+        (delta,),
+    )
+
+def xp_base(df: pd.DataFrame) -> int:
+    # running sum of per-checkin XP; maintained incrementally on writes so
+    # the read path is O(1) instead of rescanning the whole history
+    v = meta_get("xp_base", "")
+    if v == "":
+        # backfill once for databases that predate the running total
+        base = compute_xp_base(df)
+        meta_set("xp_base", str(base))
+        return base
+    return int(v)
 
 # -----------------------------
 # Game Logic
 # -----------------------------
-INTENSITY_XP = {
-    "Minimum (showed up)": 20,     # 10–20 minutes, mobility, light cardio etc.
-    "Standard": 50,                # normal session
-    "Hard": 80,                    # tough session
-    "Recovery / Mobility": 25,     # deliberate recovery
-}
+# intensity is stored as a small integer code (the index below) — int
+# comparisons and array takes instead of string hashing, smaller rows
+INTENSITY_LABELS = [
+    "Minimum (showed up)",     # 10–20 minutes, mobility, light cardio etc.
+    "Standard",                # normal session
+    "Hard",                    # tough session
+    "Recovery / Mobility",     # deliberate recovery
+]
+_INTENSITY_XP_ARR = np.array([20, 50, 80, 25], dtype=np.int32)
 
 def minutes_bonus(minutes: int) -> int:
     # small bonus that doesn't punish short sessions
     # caps at +30
     return min(30, max(0, int(minutes // 10) * 3))
 
+def checkin_xp(intensity: int, minutes: int) -> int:
+    # per-checkin contribution; the streak bonus is applied globally on read
+    base = int(_INTENSITY_XP_ARR[intensity]) if 0 <= intensity < len(INTENSITY_LABELS) else 30
+    return base + minutes_bonus(minutes)
+
 def streak_bonus(streak: int) -> int:
     # gentle compounding, capped so it doesn't get silly
     return min(40, int(math.log2(streak + 1) * 10))
 
-def level_from_xp(xp: int) -> int:
-    # quadratic-ish curve: level grows slower over time
-    # L1 at 0xp, L2 ~200, L3 ~450, L4 ~750...
-    level = 1
-    while xp >= xp_needed_for_level(level + 1):
-        level += 1
-    return level
-
 def xp_needed_for_level(level: int) -> int:
     # total XP required to reach this level
     # tweakable
     return int(150 * (level - 1) ** 2 + 200 * (level - 1))
 
+# cumulative threshold for each level, precomputed once at import —
+# _LEVEL_THRESHOLDS[L-1] == xp_needed_for_level(L); level 200 sits near
+# 6M XP, far beyond anything a daily check-in habit can accumulate
+_LEVEL_THRESHOLDS = np.array([xp_needed_for_level(L) for L in range(1, 200)], dtype=np.int64)
+
+def level_from_xp(xp: int) -> int:
+    # quadratic-ish curve: level grows slower over time
+    # L1 at 0xp, L2 ~200, L3 ~450, L4 ~750...
+    # exact integer binary search over the table — no float rounding edge
+    return max(1, int(np.searchsorted(_LEVEL_THRESHOLDS, xp, side="right")))
+
 def progress_to_next_level(xp: int):
     lvl = level_from_xp(xp)
     lo = xp_needed_for_level(lvl)
     hi = xp_needed_for_level(lvl + 1)
     return lvl, lo, hi, (xp - lo) / max(1, (hi - lo))
 
-def compute_streak(days: set[date], today: date) -> int:
+def compute_streak(df: pd.DataFrame, today: date) -> int:
     # streak ends at today if checked in today, otherwise ends at yesterday
-    anchor = today if today in days else (today - timedelta(days=1))
-    streak = 0
-    d = anchor
-    while d in days:
-        streak += 1
-        d -= timedelta(days=1)
-    return streak
-
-@dataclass
-class Achievement:
-    key: str
-    title: str
-    desc: str
-    predicate: callable  # (df, xp, streak) -> bool
-
-def achievements():
-    return [
-        Achievement("first_blood", "First Check-in", "You showed up once. Identity begins.", lambda df, xp, streak: len(df) >= 1),
-        Achievement("streak_7", "7-Day Streak", "Seven days. Most people quit before this.", lambda df, xp, streak: streak >= 7),
-        Achievement("streak_30", "30-Day Streak", "A real system has formed.", lambda df, xp, streak: streak >= 30),
-        Achievement("month_14", "14 This Month", "You trained 14+ days in the current month.", lambda df, xp, streak: month_count(df) >= 14),
-        Achievement("month_25", "25 This Month", "Relentless month. Serious momentum.", lambda df, xp, streak: month_count(df) >= 25),
-        Achievement("xp_1000", "1,000 XP", "You’re not ‘trying’ anymore. You’re doing.", lambda df, xp, streak: xp >= 1000),
-        Achievement("xp_5000", "5,000 XP", "You’ve built a machine.", lambda df, xp, streak: xp >= 5000),
-    ]
-
-def month_count(df: pd.DataFrame) -> int:
     if df.empty:
         return 0
-    now = datetime.now(TZ).date()
-    start = now.replace(day=1)
-    return int((df["day"] >= start).sum())
-
-def compute_xp(df: pd.DataFrame) -> int:
+    # df is already sorted by day, so the streak is the trailing run of
+    # consecutive 1-day diffs — one NumPy pass instead of a per-day walk
+    arr = df["day"].to_numpy().astype("datetime64[D]")
+    if (np.datetime64(today, "D") - arr[-1]).astype(int) > 1:
+        return 0
+    diffs = (arr[1:] - arr[:-1]).astype(int)
+    breaks = np.nonzero(diffs[::-1] != 1)[0]
+    run = int(breaks[0]) if breaks.size else diffs.size
+    return run + 1
+
+# (key, title, desc, kind, threshold) — kind picks a precomputed stat in
+# achievements_panel, so unlocking is a plain int comparison; built once
+# at import rather than reallocated every rerun
+_ACHIEVEMENTS = [
+    ("first_blood", "First Check-in", "You showed up once. Identity begins.", "count", 1),
+    ("streak_7", "7-Day Streak", "Seven days. Most people quit before this.", "streak", 7),
+    ("streak_30", "30-Day Streak", "A real system has formed.", "streak", 30),
+    ("month_14", "14 This Month", "You trained 14+ days in the current month.", "month", 14),
+    ("month_25", "25 This Month", "Relentless month. Serious momentum.", "month", 25),
+    ("xp_1000", "1,000 XP", "You’re not ‘trying’ anymore. You’re doing.", "xp", 1000),
+    ("xp_5000", "5,000 XP", "You’ve built a machine.", "xp", 5000),
+]
+
+def month_count(today: date) -> int:
+    return count_checkins(today.replace(day=1))
+
+def compute_xp_base(df: pd.DataFrame) -> int:
+    # full-history recompute; only used to backfill meta's running total
     if df.empty:
         return 0
-    total = 0
-    days_set = set(df["day"].tolist())
-    today = datetime.now(TZ).date()
-
-    # compute per-checkin xp using current streak at that time (approx using rolling)
-    # simple approach: compute current overall streak bonus once
-    current_streak = compute_streak(days_set, today)
-
-    for _, r in df.iterrows():
-        base = INTENSITY_XP.get(r["intensity"], 30)
-        total += base + minutes_bonus(int(r["minutes"]))
-    # add a global streak bonus (keeps it simple)
-    total += streak_bonus(current_streak)
-    return int(total)
-
-def quest_status(df: pd.DataFrame):
+    # vectorized: one pass over int arrays instead of iterrows
+    codes = df["intensity"].to_numpy(dtype=np.int64)
+    base = np.where((codes >= 0) & (codes < len(INTENSITY_LABELS)),
+                    _INTENSITY_XP_ARR.take(codes, mode="clip"), 30)
+    mins = df["minutes"].to_numpy(dtype=np.int64)
+    bonus = np.minimum(30, (mins // 10) * 3).clip(min=0)
+    return int(base.sum() + bonus.sum())
+
+def quest_status(df: pd.DataFrame, today: date):
     # small “quests” that refresh daily/monthly
-    today = datetime.now(TZ).date()
-    days = set(df["day"].tolist()) if not df.empty else set()
 
     # Weekly quest: 5 check-ins in last 7 days
-    last7_start = today - timedelta(days=6)
-    last7 = df[(df["day"] >= last7_start) & (df["day"] <= today)] if not df.empty else df
-    q_week = (len(last7), 5)
+    q_week = (count_checkins(today - timedelta(days=6), today), 5)
 
     # Monthly quest: 20 check-ins this month
-    start_month = today.replace(day=1)
-    month = df[df["day"] >= start_month] if not df.empty else df
-    q_month = (len(month), 20)
+    q_month = (count_checkins(today.replace(day=1)), 20)
 
     # Streak quest: 14-day streak
-    streak = compute_streak(days, today)
+    streak = compute_streak(df, today)
     q_streak = (streak, 14)
 
     return {
@@ -224,104 +322,101 @@ def header_card(name: str, streak: int, xp: int):
     st.progress(min(1.0, max(0.0, p)))
     st.write(f"Next level at **{hi} XP** (you’re at **{xp}**)")
 
-def github_heatmap(df: pd.DataFrame):
+# Emoji scale (0..3); indexing this with the clipped grid maps every cell
+# in one NumPy take instead of a per-cell Python call
+_HEAT_CELLS = np.array(["⬛", "🟩", "🟦", "🟪"])
+
+def github_heatmap(df: pd.DataFrame, today: date):
     st.subheader("🗓️ Consistency Map")
     if df.empty:
         st.info("No check-ins yet. Your first one starts the chain.")
         return
 
     # last 16 weeks (approx GitHub view)
-    today = datetime.now(TZ).date()
     start = today - timedelta(days=7 * 16 - 1)
-    days = pd.date_range(start, today, freq="D").date
 
-    counts = {d: 0 for d in days}
-    for d in df["day"].tolist():
-        if d in counts:
-            counts[d] += 1
+    # vectorized: count per calendar day, then scatter into a 7 x W grid
+    # (rows = Monday..Sunday) without any Python-level row iteration —
+    # datetime64[D] is a plain int64 day number, so the whole window is
+    # one np.arange and counting is one np.bincount
+    start64 = np.datetime64(start, "D")
+    days = np.arange(start64, np.datetime64(today, "D") + 1)
+    offsets = (df["day"].to_numpy().astype("datetime64[D]") - start64).astype(np.int64)
+    offsets = offsets[(offsets >= 0) & (offsets < days.size)]
+    counts = np.bincount(offsets, minlength=days.size)
+
+    dow = (days.astype(np.int64) + 3) % 7  # the epoch (1970-01-01) was a Thursday
+    week = np.arange(days.size) // 7
+    weeks = (days.size + 6) // 7
+    grid = np.zeros((7, weeks), dtype=np.int8)
+    grid[dow, week] = counts
 
-    heat = pd.DataFrame({"day": list(counts.keys()), "count": list(counts.values())})
-    heat["dow"] = pd.to_datetime(heat["day"]).dt.day_name()
-    heat["week"] = (pd.to_datetime(heat["day"]) - pd.to_datetime(start)).dt.days // 7
-
-    # Map day_name to order
     order = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
-    heat["dow"] = pd.Categorical(heat["dow"], categories=order, ordered=True)
-    heat = heat.sort_values(["week", "dow"])
-
-    # Render as simple table grid using markdown (no external viz libs)
-    # Build a 7 x N grid
-    weeks = int(heat["week"].max()) + 1
-    grid = [[0 for _ in range(weeks)] for _ in range(7)]
-    dow_to_row = {name: i for i, name in enumerate(order)}
-
-    for _, r in heat.iterrows():
-        row = dow_to_row[str(r["dow"])]
-        col = int(r["week"])
-        grid[row][col] = int(r["count"])
-
-    # Emoji scale (0..3)
-    def cell(v):
-        if v <= 0: return "⬛"
-        if v == 1: return "🟩"
-        if v == 2: return "🟦"
-        return "🟪"
-
-    lines = []
-    for i, name in enumerate(order):
-        lines.append(f"**{name[:3]}** " + " ".join(cell(v) for v in grid[i]))
+
+    cells = _HEAT_CELLS[np.clip(grid, 0, 3)]
+    lines = [f"**{name[:3]}** " + " ".join(cells[i].tolist()) for i, name in enumerate(order)]
 
     st.markdown("\n\n".join(lines))
     st.caption("⬛ none · 🟩 1 · 🟦 2 · 🟪 3+ (same day double logs are blocked)")
 
-def achievements_panel(df: pd.DataFrame, xp: int, streak: int):
+def achievements_panel(df: pd.DataFrame, xp: int, streak: int, today: date):
     st.subheader("🏅 Achievements")
     unlocked = []
     locked = []
 
-    for a in achievements():
-        ok = a.predicate(df, xp, streak)
-        (unlocked if ok else locked).append(a)
+    # compute each stat once; every badge check is then an int comparison
+    stats = {"count": len(df), "streak": streak, "month": month_count(today), "xp": xp}
+    for key, title, desc, kind, threshold in _ACHIEVEMENTS:
+        (unlocked if stats[kind] >= threshold else locked).append((title, desc))
 
     if unlocked:
-        for a in unlocked:
-            st.success(f"**{a.title}** — {a.desc}")
+        for title, desc in unlocked:
+            st.success(f"**{title}** — {desc}")
     else:
         st.info("No achievements yet. First check-in unlocks the first badge.")
 
     if locked:
         with st.expander("Locked achievements"):
-            for a in locked:
-                st.write(f"🔒 **{a.title}** — {a.desc}")
+            for title, desc in locked:
+                st.write(f"🔒 **{title}** — {desc}")
 
-def quests_panel(df: pd.DataFrame):
+def quests_panel(df: pd.DataFrame, today: date):
     st.subheader("🧩 Quests")
-    qs = quest_status(df)
+    qs = quest_status(df, today)
     for k, (cur, target) in qs.items():
         st.write(f"**{k}**")
         st.progress(min(1.0, cur / target))
         st.caption(f"{cur} / {target}")
 
-def log_panel(df: pd.DataFrame):
+@st.fragment
+def log_panel():
     st.subheader("✅ Daily Check-in")
 
+    # fragment: form interactions rerun only this block. Arguments would
+    # go stale across fragment reruns, so fetch state fresh here — the
+    # frame read is served from the db_version-keyed cache anyway.
     today = datetime.now(TZ).date()
-    already = has_checkin(today)
+    df = read_checkins(st.session_state.get("db_version", 0))
+    already = today in df.attrs["days_set"]
 
     with st.form("checkin_form", clear_on_submit=False):
-        intensity = st.selectbox("Session type", list(INTENSITY_XP.keys()), index=1)
+        intensity = st.selectbox(
+            "Session type", range(len(INTENSITY_LABELS)), index=1,
+            format_func=INTENSITY_LABELS.__getitem__,
+        )
         minutes = st.slider("Minutes (roughly)", 5, 120, 35, step=5)
         notes = st.text_input("Notes (optional)", placeholder="e.g., late night = still showed up")
 
         submitted = st.form_submit_button("Log today's gym visit")
 
     if submitted:
-        if already:
-            st.warning("Today is already logged. The chain is protected.")
-        else:
-            add_checkin(today, intensity, int(minutes), notes or "")
+        # the UPSERT reports duplicates itself — no pre-check round-trip
+        if add_checkin(today, intensity, int(minutes), notes or ""):
             st.success("Logged. Attendance secured.")
-            st.rerun()
+            # data changed: the other panels need the fresh frame too
+            st.rerun(scope="app")
+        else:
+            st.warning("Today is already logged. The chain is protected.")
 
     colA, colB = st.columns(2)
     with colA:
@@ -331,26 +426,23 @@ def log_panel(df: pd.DataFrame):
         if already and st.button("Undo today's check-in"):
             delete_checkin(today)
             st.info("Undid today. (Use this only for accidental logs.)")
-            st.rerun()
+            st.rerun(scope="app")
 
-def history_panel(df: pd.DataFrame):
+def history_panel():
     st.subheader("📜 History")
-    if df.empty:
+    show = read_recent_checkins(st.session_state.get("db_version", 0))
+    if show.empty:
         return
 
-    show = df.copy()
-    show["day"] = show["day"].astype(str)
-    show["minutes"] = show["minutes"].astype(int)
-    show = show.sort_values("day", ascending=False)
-
+    # day/created_at arrive as ISO strings, already display-ready;
+    # intensity codes map back to labels only here, at render time
+    show["intensity"] = show["intensity"].map(dict(enumerate(INTENSITY_LABELS)))
     st.dataframe(show, use_container_width=True, hide_index=True)
 
 # -----------------------------
 # Main
 # -----------------------------
 def main():
-    init_db()
-
     # Profile name (simple personalization)
     if "player_name" not in st.session_state:
         st.session_state.player_name = meta_get("player_name", "Player")
@@ -367,29 +459,28 @@ def main():
         st.write("**Rule:** You go every day. The workout can vary. Attendance does not.")
         st.caption("Tip: On chaos days, log a Minimum or Mobility session. Keep the chain.")
 
-    df = read_checkins()
-    days_set = set(df["day"].tolist()) if not df.empty else set()
+    df = read_checkins(st.session_state.get("db_version", 0))
     today = datetime.now(TZ).date()
 
-    streak = compute_streak(days_set, today)
-    xp = compute_xp(df)
+    streak = compute_streak(df, today)
+    xp = xp_base(df) + streak_bonus(streak)
 
     header_card(st.session_state.player_name, streak, xp)
 
     st.divider()
-    log_panel(df)
+    log_panel()
 
     st.divider()
-    quests_panel(df)
+    quests_panel(df, today)
 
     st.divider()
-    achievements_panel(df, xp, streak)
+    achievements_panel(df, xp, streak, today)
 
     st.divider()
-    github_heatmap(df)
+    github_heatmap(df, today)
 
     st.divider()
-    history_panel(df)
+    history_panel()
 
     st.divider()
     st.subheader("🧠 The Contract")